@@ -7,19 +7,33 @@ and debugging improvements:
 
 - `--dry-run` to print adb commands instead of executing them
 - `--log-dumpsys N` to collect top-activity values for N cycles
+- one persistent `adb shell` session shared by taps, keyevents and dumpsys
+- `--device A B ...` to drive several devices at once (one worker thread each)
 - expanded ad/package/activity pattern lists from user input
 
 This file is safe to run from the repo as: `python3 scripts/balloon_master_ads.py`
 """
 
-import argparse
+import atexit
+import os
+import queue
 import subprocess
 import time
 import sys
 import re
+import shlex
 import random
 import traceback
 import logging
+import threading
+from contextlib import closing
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor, wait
+
+try:
+    import ahocorasick  # optional: `pip install pyahocorasick`
+except ImportError:
+    ahocorasick = None
 
 # ===============================================================
 # =============== CONFIG — BALLOON MASTER 3D ====================
@@ -35,6 +49,7 @@ LVL_BTN = (300, 1317)  # Main screen level button
 PAUSE_MENU = (625, 133)  # In-game pause button
 HOME_BTN = (159, 851)  # Pause menu -> Home (TRIGGERS AD)
 RETRY_BTN = (569, 884)  # Pause menu -> Retry (TRIGGERS AD)
+USE_SENDEVENT_TAPS = True  # Inject taps with `sendevent` when the panel allows; False = always `input tap`
 
 # ---- Ad Strategy ----
 USE_HOME_FIRST = False  # prefer RETRY only to trigger ads (avoids home-triggered popups)
@@ -45,14 +60,21 @@ BACK_BUTTON_ATTEMPTS = (4, 6)  # Random between 4-6 attempts
 BACK_BUTTON_DELAY = (0.5, 0.8)  # Random delay between back attempts
 HOME_BUTTON_BURST = 3  # How many home button presses in burst
 STICKY_AD_THRESHOLD = 2  # After this many same ads, escalate
+SHORT_BACK_ATTEMPTS = 2  # Back presses in the speculative-clear back probe
+SPECULATIVE_CLEAR_SEC = 5.0  # Max time for the interleaved tap/back probes before escalating
 
 # ---- Timing ----
 GAME_READY_DELAY_SEC = 6.0  # Wait on first launch
 APP_RESTART_WAIT_SEC = 12.0  # Wait after app restart
 CYCLE_COOLDOWN_SEC = (1.9, 2.2)  # Random cooldown between cycles
+POLL_INTERVAL_SEC = 0.15  # How often wait_until() re-checks device state
+TOP_CACHE_TTL_SEC = 0.25  # Reuse a top-activity lookup for this long (invalidated by any input)
+SHELL_TIMEOUT_SEC = 15.0  # Give up on an adb command with no reply after this long (covers `am start -W`)
 
 # ---- Tap Jitter ----
 JITTER_PX = 3
+JITTER_POOL_SIZE = 256  # Jitter offsets pre-drawn per cycle (must be even: taps take two)
+RNG_SEED = 0xBA110011  # Per-device RNG seed under --dry-run only, so dry-runs replay the same taps/delays
 
 # Common locations for ad-close buttons (try several common corners/areas)
 # Values are (x, y) and should be adjusted per device if needed.
@@ -70,19 +92,83 @@ POPUP_CLOSE_COORDS = []
 # ===============================================================
 # ===================== INTERNAL STATE ==========================
 # ===============================================================
-ad_cycle = 0
-# Always use retry to trigger ads (home can cause problematic popups)
-button_mode = "retry"
-needs_lvl_click = False
-
-# Sticky ad tracking
-sticky_ad_counter = 0
-last_ad_package = None
+SHELL_SENTINEL = "__END__"
 
-# Runtime flags (populated from argparse)
+# Runtime flags (populated by parse_args)
 DRY_RUN = False
 LOG_DUMPSYS = 0
 
+
+class DeviceWorker:
+    """
+    Everything tied to one device. Each device gets its own worker thread; helpers
+    find the worker for the calling thread via `current_worker()`.
+    """
+
+    def __init__(self, serial):
+        self.serial = serial
+        self.adb_prefix = ("adb", "-s", serial) if serial else ("adb",)
+        self.ad_cycle = 0
+        # Always use retry to trigger ads (home can cause problematic popups)
+        self.button_mode = "retry"
+        self.needs_lvl_click = False
+
+        # Sticky ad tracking
+        self.sticky_ad_counter = 0
+        self.last_ad_package = None
+
+        # Persistent `adb shell` session (see open_adb_shell); the lock is held per round-trip
+        # because send() is also called from the speculative-clear workers, which also hold it
+        # across a whole probe step (see probe_step) — hence re-entrant
+        self.adb_shell = None
+        # Session stdout, line by line, fed by a reader thread so reads can time out (None = EOF)
+        self.adb_shell_lines = None
+        self.adb_shell_lock = threading.RLock()
+        # Whether adbd accepts `shell -T`: None = not known yet, False = no (exec-out for everything)
+        self.shell_v2 = None
+
+        # Game launcher activity ("pkg/.Activity") resolved once at startup; None = fall back to monkey
+        self.launch_component = None
+
+        # Touchscreen for `sendevent` taps as (event device, x scale, y scale, extra touch-down events);
+        # None = use `input tap`
+        self.touchscreen = None
+        self.tracking_id = 0
+
+        # Per-device RNG + per-cycle pool of pre-drawn jitter offsets (see refill_jitter_pool).
+        # Live runs draw from OS entropy: a fixed seed would replay the same "random" timing every session
+        self.rng = random.Random(f"{RNG_SEED}/{serial}") if DRY_RUN else random.Random()
+        self.jitter_pool = self.rng.choices(range(-JITTER_PX, JITTER_PX + 1), k=JITTER_POOL_SIZE)
+        self.jitter_idx = 0
+
+        # Last top-activity lookup as (monotonic timestamp, package); None = stale
+        self.top_cache = None
+        # Last parsed focus line as (raw line, package): an unchanged line skips the regex work
+        self.last_focus = (None, "")
+
+
+# Worker bound to the current thread (see run_loop / bound_to); only the main thread may fall back to the default device
+_local = threading.local()
+_default_worker = DeviceWorker(DEFAULT_DEVICE)
+
+# Set on Ctrl-C so every worker finishes its cycle and exits
+stop_all = threading.Event()
+
+# Top-activity lookups, filtered on the device so only a few lines cross the wire.
+# TOP_ACTIVITY_PROBE is also appended to batched scripts to get the post-burst state in the same round-trip.
+TOP_ACTIVITY_KEYS = "mResumedActivity|mCurrentFocus|mFocusedApp"
+TOP_ACTIVITY_PROBE = f"dumpsys window windows | grep -E '{TOP_ACTIVITY_KEYS}' | head -n 4"
+TOP_ACTIVITY_FALLBACK = f"dumpsys activity activities | grep -E '{TOP_ACTIVITY_KEYS}' | head -n 4"
+_KEY_RE = re.compile(f"(?:{TOP_ACTIVITY_KEYS})")
+_TOP_RE = re.compile(r"([\w\.]+)(?:/|$)")
+
+# --dry-run lines are buffered and written to stdout every DRY_RUN_FLUSH_EVERY lines (and at exit)
+DRY_RUN_FLUSH_EVERY = 1024
+_dry_buf = bytearray()
+_dry_writes = 0
+# Held while appending to / swapping out the buffer: every device and speculative-clear thread echoes here
+_dry_lock = threading.Lock()
+
 # ===============================================================
 # ==================== AD/ACTIVITY PATTERNS ======================
 # ===============================================================
@@ -157,30 +243,303 @@ BROWSER_PACKAGES = {
     "com.vivaldi.browser",
 }
 
+# Pattern sets folded into pre-compiled alternations: one C-level scan instead of a Python loop per set
+AD_MATCH_RE = re.compile("|".join(re.escape(p) for p in (AD_KEYWORDS | AD_PACKAGES | BROWSER_PACKAGES)), re.IGNORECASE)
+
+# Danger entries are all "pkg" or "pkg/Activity": one C-level `startswith` over the unique packages
+_DANGER_PREFIXES = tuple({d.split("/")[0] for d in DANGEROUS_ACTIVITIES} | DANGEROUS_PACKAGES)
+
+# Same literals as an Aho-Corasick automaton when pyahocorasick is installed (AD_MATCH_RE otherwise)
+AD_AUTOMATON = None
+if ahocorasick is not None:
+    AD_AUTOMATON = ahocorasick.Automaton()
+    for word in AD_KEYWORDS | AD_PACKAGES | BROWSER_PACKAGES:
+        AD_AUTOMATON.add_word(word.lower(), True)
+    AD_AUTOMATON.make_automaton()
+
 # ===============================================================
 # ==================== HELPER FUNCTIONS ==========================
 # ===============================================================
 
 
-def adb(args_list):
-    """Build ADB command with device serial."""
-    base = ["adb"]
-    if DEFAULT_DEVICE:
-        base += ["-s", DEFAULT_DEVICE]
-    return base + args_list
+def current_worker():
+    """The DeviceWorker driven by the calling thread."""
+    w = getattr(_local, "worker", None)
+    if w is not None:
+        return w
+    # A pool thread without a worker would silently drive DEFAULT_DEVICE — refuse instead
+    if threading.current_thread() is not threading.main_thread():
+        raise RuntimeError(f"{threading.current_thread().name}: no DeviceWorker bound (start it via bound_to())")
+    return _default_worker
 
 
-def run_adb(args_list, show_err=False):
-    """Run ADB command and return stripped output. Honors `DRY_RUN`."""
+def bound_to(worker, fn, *args, **kwargs):
+    """Run `fn` with `worker` bound to this thread (for pool threads serving a device)."""
+    _local.worker = worker
+    return fn(*args, **kwargs)
+
+
+def adb(args_list):
+    """Build ADB command with device serial."""
+    return current_worker().adb_prefix + tuple(args_list)
+
+
+def dry_run_echo(cmd):
+    """Record an adb command instead of running it (`--dry-run`)."""
+    global _dry_writes
+    # Shell-quoted, so a `;`/`|` script stays one argument when the line is replayed
+    line = f"[dry-run] {shlex.join(cmd)}\n".encode()
+    with _dry_lock:
+        _dry_buf.extend(line)
+        _dry_writes += 1
+        due = _dry_writes >= DRY_RUN_FLUSH_EVERY
+    if due:
+        flush_dry_run()
+
+
+def flush_dry_run():
+    """Write buffered `--dry-run` lines to stdout."""
+    global _dry_buf, _dry_writes
+    with _dry_lock:
+        if not _dry_buf:
+            return
+        # Swap in a fresh buffer: the one being written is never resized or cleared under the write
+        buf, _dry_buf = _dry_buf, bytearray()
+        _dry_writes = 0
+        sys.stdout.flush()  # keep anything already printed ahead of the buffered lines
+        sys.stdout.buffer.write(buf)
+        sys.stdout.buffer.flush()
+
+
+def run_adb_oneshot(args_list, show_err=False):
+    """Run ADB command in a fresh adb process and return stripped output. Honors `DRY_RUN`."""
     cmd = adb(args_list)
     if DRY_RUN:
-        print("[dry-run] ", " ".join(cmd))
+        dry_run_echo(cmd)
         return ""
     try:
-        out = subprocess.check_output(cmd, stderr=(None if show_err else subprocess.DEVNULL), text=True)
-        return out.strip()
-    except subprocess.CalledProcessError:
+        result = subprocess.run(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=(None if show_err else subprocess.DEVNULL),
+            text=True,
+            check=False,
+            timeout=SHELL_TIMEOUT_SEC,
+        )
+    except subprocess.TimeoutExpired:
         return ""
+    return result.stdout.strip() if result.returncode == 0 else ""
+
+
+def open_adb_shell():
+    """
+    Open the long-lived `adb shell` session used by `send()`, and check it answers.
+    On an adbd that rejects `-T` (no shell_v2, pre-Android 7) the session exits at once;
+    the worker then stays on the one-shot `exec-out` path instead of respawning it per command.
+    """
+    w = current_worker()
+    if DRY_RUN or w.shell_v2 is False:
+        return
+    try:
+        w.adb_shell = subprocess.Popen(
+            adb(["shell", "-T"]),  # -T: no PTY, so no CRLF translation of dumpsys output
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=1,
+            text=True,
+            errors="ignore",
+        )
+    except OSError:
+        w.adb_shell = None
+        return
+    w.adb_shell_lines = queue.Queue()
+    threading.Thread(target=_pump_lines, args=(w.adb_shell.stdout, w.adb_shell_lines), daemon=True).start()
+
+    try:
+        _, code = _split_sentinel("".join(_reply_lines(w, "true")))
+    except TimeoutError:
+        _drop_shell(w)  # wedged device, not an unsupported one: retried on the next command
+        return
+    except (OSError, ValueError):
+        code = -1
+    if code == 0:
+        w.shell_v2 = True
+        return
+
+    _drop_shell(w)
+    # Exited right away: only blame -T if it never worked and the device itself is reachable
+    if w.shell_v2 is None and run_adb_oneshot(["get-state"]) == "device":
+        w.shell_v2 = False
+        print(f"[config] {w.serial}: adbd rejects `shell -T` (no shell_v2) - sending each command via exec-out")
+
+
+def _pump_lines(stream, lines):
+    """Reader thread for a shell session: copy its stdout into `lines`, then None at EOF."""
+    try:
+        for line in stream:
+            lines.put(line)
+    except (OSError, ValueError):
+        pass
+    lines.put(None)
+
+
+def _drop_shell(w):
+    """Kill a dead or wedged session; the next command reopens it."""
+    if w.adb_shell is not None:
+        w.adb_shell.kill()
+        w.adb_shell = None
+
+
+def _shell_timed_out(w, cmd):
+    """A command got no reply within `SHELL_TIMEOUT_SEC`: restart the session instead of waiting forever."""
+    print(f"[adb] {w.serial}: no reply to {cmd[:60]!r} after {SHELL_TIMEOUT_SEC:.0f}s - restarting shell session")
+    _drop_shell(w)
+
+
+def close_adb_shell():
+    """Close the persistent shell session (if open)."""
+    w = current_worker()
+    if w.adb_shell is None:
+        return
+    try:
+        w.adb_shell.stdin.write("exit\n")
+        w.adb_shell.stdin.flush()
+        w.adb_shell.wait(timeout=2)
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        w.adb_shell.kill()
+    w.adb_shell = None
+
+
+def _split_sentinel(out):
+    """Split `<output><SENTINEL><exit code>` into (output, exit code)."""
+    head, sep, code = out.rpartition(SHELL_SENTINEL)
+    if not sep:
+        return out.strip(), -1
+    try:
+        return head.strip(), int(code.strip())
+    except ValueError:
+        return head.strip(), -1
+
+
+def _live_shell(w):
+    """Return the worker's persistent session, reopening it if it died. Caller holds `adb_shell_lock`."""
+    # Session died (device dropped / adb restarted) — reopen it once
+    if w.adb_shell is None or w.adb_shell.poll() is not None:
+        open_adb_shell()
+    return w.adb_shell
+
+
+def _reply_lines(w, cmd):
+    """
+    Write `cmd` to the worker's session and yield its raw reply lines, ending with the sentinel line.
+    Raises TimeoutError if the reply isn't complete within `SHELL_TIMEOUT_SEC`, OSError if the session dies.
+    """
+    w.adb_shell.stdin.write(f"{cmd}; echo {SHELL_SENTINEL}$?\n")
+    w.adb_shell.stdin.flush()
+    deadline = time.monotonic() + SHELL_TIMEOUT_SEC
+    while True:
+        try:
+            line = w.adb_shell_lines.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            raise TimeoutError(cmd) from None
+        if line is None:
+            raise OSError("adb shell session closed")
+        yield line
+        if SHELL_SENTINEL in line:
+            return
+
+
+def send(cmd):
+    """
+    Run a shell command through the persistent `adb shell` session.
+    Returns (stripped output, exit code). Honors `DRY_RUN`.
+    If the session is unavailable or dies mid-command, the command is re-run once as a
+    one-shot `exec-out`; a command that times out is not re-run (it may have taken effect).
+    """
+    w = current_worker()
+    if DRY_RUN:
+        dry_run_echo(adb(["shell", cmd]))
+        return "", 0
+
+    with w.adb_shell_lock:
+        if _live_shell(w) is not None:
+            try:
+                return _split_sentinel("".join(_reply_lines(w, cmd)))
+            except TimeoutError:
+                _shell_timed_out(w, cmd)
+                return "", -1
+            except (OSError, ValueError):
+                _drop_shell(w)
+        return _split_sentinel(run_adb_oneshot(["exec-out", f"{cmd}; echo {SHELL_SENTINEL}$?"]))
+
+
+def stream_lines(cmd):
+    """
+    Yield a shell command's output lines as they arrive so the caller can stop early
+    (close the generator, e.g. via `contextlib.closing`). Honors `DRY_RUN`.
+    On the persistent session the rest of the reply is drained on close to keep it
+    in sync; on the one-shot fallback the adb process is killed instead.
+    """
+    w = current_worker()
+    if DRY_RUN:
+        dry_run_echo(adb(["shell", cmd]))
+        return
+
+    with w.adb_shell_lock:
+        if _live_shell(w) is not None:
+            reply = _reply_lines(w, cmd)
+            yielded = False
+            try:
+                for line in reply:
+                    head, sep, _ = line.partition(SHELL_SENTINEL)
+                    if not sep:
+                        yielded = True
+                        yield line.rstrip("\n")
+                    elif head:
+                        yielded = True
+                        yield head
+                return
+            except TimeoutError:
+                _shell_timed_out(w, cmd)
+                return
+            except (OSError, ValueError):
+                # Session died: retry as a one-shot below unless lines already went out
+                _drop_shell(w)
+                if yielded:
+                    return
+            finally:
+                try:
+                    for _ in reply:
+                        pass
+                except (OSError, ValueError):
+                    _drop_shell(w)
+
+        proc = subprocess.Popen(
+            adb(["exec-out", cmd]), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, errors="ignore"
+        )
+        watchdog = threading.Timer(SHELL_TIMEOUT_SEC, proc.kill)
+        watchdog.start()
+        try:
+            for line in proc.stdout:
+                yield line.rstrip("\n")
+        finally:
+            watchdog.cancel()
+            proc.kill()
+            proc.wait()
+
+
+def run_shell_script(script):
+    """Run a `;`-joined shell script in a single adb round-trip and return its output."""
+    invalidate_top_cache()
+    out, _ = send(script)
+    return out
+
+
+def key_burst_script(keycode, delays):
+    """Shell snippet pressing `keycode` once per entry in `delays`, sleeping that long after each."""
+    # toybox `sleep` on Android accepts fractional seconds
+    return "; ".join(f"input keyevent {keycode}; sleep {d:.2f}" for d in delays)
 
 
 def boot_win_adb_once():
@@ -193,92 +552,264 @@ def boot_win_adb_once():
             pass
 
 
+def detect_touchscreen():
+    """
+    Find the multitouch event device and its axis scaling (once, at startup) so taps
+    can be injected with `sendevent` instead of spawning the `input` VM on the device.
+    Stays on `input tap` (returns None) when `USE_SENDEVENT_TAPS` is off or the panel isn't
+    a protocol-B device with zero-based position axes.
+    """
+    w = current_worker()
+    w.touchscreen = None
+    if not USE_SENDEVENT_TAPS:
+        return None
+    out, _ = send("getevent -lp; wm size")
+
+    # ABS_MT_* axis name -> (min, max) for the first device that reports positions
+    device, axes = None, {}
+    for line in out.splitlines():
+        m = re.match(r"add device \d+: (\S+)", line)
+        if m:
+            if "POSITION_X" in axes and "POSITION_Y" in axes:
+                break
+            device, axes = m.group(1), {}
+            continue
+        m = re.search(r"ABS_MT_(\w+)\s*:.*\bmin (-?\d+), max (-?\d+)", line)
+        if m:
+            axes[m.group(1)] = (int(m.group(2)), int(m.group(3)))
+
+    # "Override size" (if any) is listed after "Physical size" and is what taps are relative to
+    sizes = re.findall(r"size: (\d+)x(\d+)", out)
+    protocol_b = {"SLOT", "TRACKING_ID", "POSITION_X", "POSITION_Y"} <= axes.keys()
+    if not (device and sizes and protocol_b and axes["POSITION_X"][0] == 0 and axes["POSITION_Y"][0] == 0):
+        return None
+
+    # Panels that report pressure / contact size treat a contact without them as hovering:
+    # send a mid-range value on touch-down (ABS_MT_TOUCH_MAJOR = 48, ABS_MT_PRESSURE = 58)
+    contact = []
+    for name, code in (("TOUCH_MAJOR", 48), ("PRESSURE", 58)):
+        if name in axes:
+            if axes[name][1] <= 0:
+                return None
+            contact.append((3, code, max(1, axes[name][1] // 2)))
+
+    width, height = map(int, sizes[-1])
+    x_max, y_max = axes["POSITION_X"][1], axes["POSITION_Y"][1]
+    w.touchscreen = (device, (x_max + 1) / width, (y_max + 1) / height, tuple(contact))
+    return w.touchscreen
+
+
+def sendevent_tap(x, y):
+    """Shell snippet for one multitouch (protocol B) down/up at screen point (x, y)."""
+    w = current_worker()
+    dev, sx, sy, contact = w.touchscreen
+    w.tracking_id = (w.tracking_id + 1) % 65535
+    events = (
+        (3, 47, 0),  # ABS_MT_SLOT
+        (3, 57, w.tracking_id),  # ABS_MT_TRACKING_ID
+        (3, 53, round(x * sx)),  # ABS_MT_POSITION_X
+        (3, 54, round(y * sy)),  # ABS_MT_POSITION_Y
+        *contact,  # ABS_MT_TOUCH_MAJOR / ABS_MT_PRESSURE, when the panel has them
+        (1, 330, 1),  # BTN_TOUCH down
+        (0, 0, 0),  # SYN_REPORT
+        (3, 57, -1),  # lift finger
+        (1, 330, 0),  # BTN_TOUCH up
+        (0, 0, 0),  # SYN_REPORT
+    )
+    return "; ".join(f"sendevent {dev} {t} {c} {v}" for t, c, v in events)
+
+
+def tap_script(points, delay=0.0):
+    """Shell snippet tapping each (x, y) in `points`, sleeping `delay` after each."""
+    use_sendevent = current_worker().touchscreen is not None
+    steps = []
+    for x, y in points:
+        steps.append(sendevent_tap(x, y) if use_sendevent else f"input tap {x} {y}")
+        if delay:
+            steps.append(f"sleep {delay:.2f}")
+    return "; ".join(steps)
+
+
+def tap_batch(points, delay=0.0):
+    """Tap every (x, y) in `points` in a single adb round-trip."""
+    return run_shell_script(tap_script(points, delay))
+
+
+def refill_jitter_pool():
+    """Pre-draw this cycle's jitter offsets from the device's RNG."""
+    w = current_worker()
+    w.jitter_pool = w.rng.choices(range(-JITTER_PX, JITTER_PX + 1), k=JITTER_POOL_SIZE)
+    w.jitter_idx = 0
+
+
+def jitter(x, y):
+    """Randomize a tap point by up to `JITTER_PX` to avoid bot detection."""
+    w = current_worker()
+    i = w.jitter_idx
+    w.jitter_idx = (i + 2) % JITTER_POOL_SIZE
+    return x + w.jitter_pool[i], y + w.jitter_pool[i + 1]
+
+
 def tap(x, y):
     """Tap with jitter to avoid bot detection."""
-    jx = x + random.randint(-JITTER_PX, JITTER_PX)
-    jy = y + random.randint(-JITTER_PX, JITTER_PX)
-    run_adb(["shell", "input", "tap", str(jx), str(jy)])
+    tap_batch([jitter(x, y)])
 
 
 def go_home():
     """Press HOME."""
-    run_adb(["shell", "input", "keyevent", "KEYCODE_HOME"])
+    invalidate_top_cache()
+    send("input keyevent KEYCODE_HOME")
 
 
 def go_back():
     """Press BACK."""
-    run_adb(["shell", "input", "keyevent", "KEYCODE_BACK"])
+    invalidate_top_cache()
+    send("input keyevent KEYCODE_BACK")
 
 
 def app_switcher():
     """Open app switcher (recents)."""
-    run_adb(["shell", "input", "keyevent", "KEYCODE_APP_SWITCH"])
+    invalidate_top_cache()
+    send("input keyevent KEYCODE_APP_SWITCH")
 
 
 def force_stop_pkg(pkg):
     """Force-stop a package."""
-    run_adb(["shell", "am", "force-stop", pkg])
+    invalidate_top_cache()
+    run_adb_oneshot(["shell", "am", "force-stop", pkg])
 
 
 def launch_pkg(pkg):
     """Launch a package."""
-    run_adb(["shell", "monkey", "-p", pkg, "1"])
+    invalidate_top_cache()
+    run_adb_oneshot(["shell", "monkey", "-p", pkg, "1"])
+
+
+def resolve_launch_component():
+    """Look up the game's launcher activity once so relaunches can use `am start`."""
+    w = current_worker()
+    out, _ = send(
+        f"cmd package resolve-activity --brief -c android.intent.category.LAUNCHER {GAME_PACKAGE} | tail -n 1"
+    )
+    w.launch_component = out if out.startswith(GAME_PACKAGE + "/") else None
+    return w.launch_component
 
 
 def relaunch_game():
-    """Monkey launch the game without force-stop (NO HOME/BACK)."""
+    """Launch the game without force-stop (NO HOME/BACK): `am start` if resolved, else monkey."""
+    invalidate_top_cache()
+    component = current_worker().launch_component
+    if component:
+        # -W returns once the activity is up; no monkey JVM spawned on the device.
+        # MAIN + LAUNCHER like monkey, so the existing task is brought forward rather than a new instance started
+        send(f"am start -W -a android.intent.action.MAIN -c android.intent.category.LAUNCHER -n {component}")
+        return
+    cmd = adb(["shell", "monkey", "-p", GAME_PACKAGE, "-c", "android.intent.category.LAUNCHER", "1"])
     if DRY_RUN:
-        print("[dry-run] monkey relaunch", GAME_PACKAGE)
+        dry_run_echo(cmd)
         return
-    subprocess.call(adb(["shell", "monkey", "-p", GAME_PACKAGE, "-c", "android.intent.category.LAUNCHER", "1"]))
+    subprocess.call(cmd)
 
 
 def relaunch_and_verify(retries=5, initial_delay=1.5):
     """Relaunch the game and verify it's foregrounded. Returns True if successful."""
+    w = current_worker()
     backoff = initial_delay
     for attempt in range(retries):
-        print(f"[relaunch] attempt {attempt+1}/{retries} (backoff {backoff}s)")
+        if stop_all.is_set():
+            return False
+        print(f"[relaunch] {w.serial}: attempt {attempt+1}/{retries} (backoff {backoff}s)")
         relaunch_game()
-        time.sleep(backoff)
 
-        top = get_top_activity()
-        if top and GAME_PACKAGE in top and not is_ad_playing():
-            print("[relaunch] verified game is foregrounded")
+        if wait_until(game_in_foreground, backoff):
+            print(f"[relaunch] {w.serial}: verified game is foregrounded")
             return True
 
         backoff = min(backoff * 1.8, 8.0)
 
-    print("[relaunch] verification failed after retries")
+    print(f"[relaunch] {w.serial}: verification failed after retries")
     return False
 
 
-def get_top_activity():
-    """Get the current top activity package name."""
-    for svc in (["shell", "dumpsys", "window", "windows"], ["shell", "dumpsys", "activity", "activities"]):
-        try:
-            cmd = adb(svc)
-            if DRY_RUN:
-                print("[dry-run] ", " ".join(cmd))
-                continue
-            out = subprocess.check_output(cmd, stderr=subprocess.DEVNULL, timeout=5).decode(errors="ignore")
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+def parse_top_activity(lines):
+    """Extract the top package name from dumpsys output lines ("" if not found)."""
+    w = current_worker()
+    for line in lines:
+        # Usual case while an ad sits on screen: same focus line as the previous poll
+        if line == w.last_focus[0]:
+            return w.last_focus[1]
+        key = _KEY_RE.search(line)
+        if not key:
             continue
-
-        for line in out.splitlines():
-            if any(k in line for k in ("mResumedActivity", "mCurrentFocus", "mFocusedApp")):
-                # Extract package name
-                match = re.search(r"([\w\.]+)(?:/|$)", line)
-                if match:
-                    pkg = match.group(1)
-                    # Filter out system UI
-                    if pkg and pkg != "com.android.systemui":
-                        return pkg
+        # Extract package name (only look past the key token)
+        match = _TOP_RE.search(line, key.end())
+        if match:
+            pkg = match.group(1)
+            # Filter out system UI
+            if pkg and pkg != "com.android.systemui":
+                w.last_focus = (line, pkg)
+                return pkg
     return ""
 
 
-def is_ad_playing():
-    """Check if ad is currently playing using expanded heuristics."""
-    top = get_top_activity()
+def invalidate_top_cache():
+    """Drop the cached top activity; call after anything that can change the screen."""
+    current_worker().top_cache = None
+
+
+def remember_top(pkg):
+    """Cache a freshly observed top activity."""
+    current_worker().top_cache = (time.monotonic(), pkg)
+    return pkg
+
+
+def get_top_activity():
+    """Get the current top activity package name (cached for `TOP_CACHE_TTL_SEC`)."""
+    cached = current_worker().top_cache
+    if cached is not None and time.monotonic() - cached[0] < TOP_CACHE_TTL_SEC:
+        return cached[1]
+
+    # Parse while the output streams in; closing stops reading at the first hit
+    with closing(stream_lines(TOP_ACTIVITY_PROBE)) as lines:
+        pkg = parse_top_activity(lines)
+    if not pkg:
+        # Window service had nothing focused — ask the activity manager instead
+        with closing(stream_lines(TOP_ACTIVITY_FALLBACK)) as lines:
+            pkg = parse_top_activity(lines)
+    return remember_top(pkg)
+
+
+def probe_step(script, stop=None):
+    """
+    Run `script` + `TOP_ACTIVITY_PROBE` in one round-trip and return True if the ad is gone.
+    With `stop` (speculative_clear), the stop check, the round-trip and the verdict all happen
+    under `adb_shell_lock`: nothing is sent once `stop` is set (returns None), and a clear sets
+    `stop` before the other probe can take the lock.
+    """
+    with current_worker().adb_shell_lock:
+        if stop is not None and stop.is_set():
+            return None
+        cleared = not is_ad_playing(probe_top(run_shell_script(f"{script}; {TOP_ACTIVITY_PROBE}")))
+        if cleared and stop is not None:
+            stop.set()
+        return cleared
+
+
+def probe_top(out):
+    """Top package from a script's `TOP_ACTIVITY_PROBE` tail, falling back to a full lookup."""
+    pkg = parse_top_activity(out.splitlines())
+    if pkg:
+        return remember_top(pkg)
+    return get_top_activity()
+
+
+def is_ad_playing(top=None):
+    """
+    Check if ad is currently playing using expanded heuristics.
+    Pass `top` to classify an already-fetched top activity instead of re-dumping.
+    """
+    if top is None:
+        top = get_top_activity()
 
     if not top:
         return False
@@ -287,55 +818,89 @@ def is_ad_playing():
     if GAME_PACKAGE in top:
         return False
 
-    lower = top.lower()
-
     # Danger activities / packages (installers, play-store flows) — treat as ad/escape
-    if any(d in top for d in DANGEROUS_ACTIVITIES) or any(p in top for p in DANGEROUS_PACKAGES):
+    if top.startswith(_DANGER_PREFIXES):
         return True
 
     # Strong pattern match on focused activity name
     if AD_ACTIVITY_PATTERNS.search(top):
         return True
 
-    # Package or keyword heuristics
-    if any(pkg in lower for pkg in AD_PACKAGES):
-        return True
-    if any(kw in lower for kw in AD_KEYWORDS):
-        return True
-
-    # Browsers/custom tabs that often open from ads
-    if any(bp in top for bp in BROWSER_PACKAGES):
+    # Package / keyword / browser heuristics (browsers and custom tabs often open from ads)
+    if AD_AUTOMATON is not None:
+        if next(AD_AUTOMATON.iter(top.lower()), None) is not None:
+            return True
+    elif AD_MATCH_RE.search(top):
         return True
 
     # If it's not the game and not system UI, assume ad context
     return True
 
 
-def close_ad_by_tap(max_rounds=2):
-    """Try common 'close' tap positions to dismiss overlays. Returns True if ad cleared."""
-    print("🖱️ Trying targeted ad-close taps...")
-    for r in range(max_rounds):
-        for (cx, cy) in CLOSE_COORDS:
-            tap(cx, cy)
-            time.sleep(0.25)
-            if not is_ad_playing():
-                print(f"✅ ad cleared by tap after {r+1} rounds")
-                return True
+def game_in_foreground():
+    """True when the game (not an ad) holds focus."""
+    top = get_top_activity()
+    return bool(top) and GAME_PACKAGE in top and not is_ad_playing(top)
+
+
+def wait_until(predicate, timeout, interval=POLL_INTERVAL_SEC):
+    """
+    Poll `predicate` (re-reading device state each time) until it is truthy or
+    `timeout` seconds pass (or Ctrl-C sets `stop_all`). Returns the last result.
+    """
+    if DRY_RUN:
+        # Nothing changes on a dry run — keep the old fixed wait and check once
+        time.sleep(timeout)
+        return predicate()
+
+    deadline = time.monotonic() + timeout
+    while True:
+        invalidate_top_cache()
+        result = predicate()
+        remaining = deadline - time.monotonic()
+        if result or remaining <= 0 or stop_all.is_set():
+            return result
+        time.sleep(min(interval, remaining))
+
+
+def close_tap_rounds(max_rounds=2):
+    """Jittered tap table for every round of `close_ad_by_tap`, drawn up front."""
+    return [[jitter(cx, cy) for (cx, cy) in CLOSE_COORDS] for _ in range(max_rounds)]
+
+
+def close_ad_by_tap(max_rounds=2, stop=None, rounds=None):
+    """
+    Try common 'close' tap positions to dismiss overlays. Returns True if ad cleared.
+    Gives up early once `stop` (a threading.Event) is set. `rounds` = pre-drawn tap table.
+    """
+    w = current_worker()
+    print(f"🖱️ {w.serial}: trying targeted ad-close taps...")
+    if rounds is None:
+        rounds = close_tap_rounds(max_rounds)
+    for r, points in enumerate(rounds):
+        # All close spots for this round + the focus probe in one round-trip
+        cleared = probe_step(tap_script(points, delay=0.25), stop)
+        if cleared is None:
+            return False
+        if cleared:
+            print(f"✅ {w.serial}: ad cleared by tap after {r+1} rounds")
+            return True
         # small pause between rounds
         time.sleep(0.4)
 
-    print("⚠️ targeted taps didn't clear ad")
+    print(f"⚠️ {w.serial}: targeted taps didn't clear ad")
     return False
 
 
 def kill_browser_packages_if_needed(current_top):
     """Force-stop browser/custom-tab packages if they're the likely ad host."""
+    w = current_worker()
     if not current_top:
         return False
 
     for bp in BROWSER_PACKAGES:
         if bp in current_top:
-            print(f"🧨 Detected browser ad host '{bp}' — force-stopping it")
+            print(f"🧨 {w.serial}: detected browser ad host '{bp}' — force-stopping it")
             force_stop_pkg(bp)
             time.sleep(0.8)
             return True
@@ -347,39 +912,107 @@ def kill_browser_packages_if_needed(current_top):
 # ===============================================================
 
 
-def back_button_burst():
-    """Aggressive back button burst with random timing."""
-    attempts = random.randint(*BACK_BUTTON_ATTEMPTS)
-    print(f"⬅️ back button burst ({attempts} attempts)...")
+def back_delays(attempts):
+    """Random delay after each of `attempts` back presses."""
+    rng = current_worker().rng
+    return [rng.uniform(*BACK_BUTTON_DELAY) for _ in range(attempts)]
 
-    for i in range(attempts):
-        go_back()
-        delay = random.uniform(*BACK_BUTTON_DELAY)
-        time.sleep(delay)
 
-        # Check every 2 attempts
-        if i % 2 == 1 and not is_ad_playing():
-            print(f"✅ back button worked after {i+1} attempts!")
+def back_button_burst(attempts=None, stop=None, delays=None):
+    """
+    Aggressive back button burst with random timing. Gives up early once `stop` is set.
+    `delays` = pre-drawn per-press delays (overrides `attempts`).
+    """
+    w = current_worker()
+    if delays is None:
+        if attempts is None:
+            attempts = w.rng.randint(*BACK_BUTTON_ATTEMPTS)
+        delays = back_delays(attempts)
+    attempts = len(delays)
+    print(f"⬅️ {w.serial}: back button burst ({attempts} attempts)...")
+
+    # Check every 2 attempts: one round-trip per pair, state probe included
+    for i in range(0, attempts, 2):
+        pair = delays[i:i + 2]
+        cleared = probe_step(key_burst_script("KEYCODE_BACK", pair), stop)
+        if cleared is None:
+            return False
+        if cleared:
+            print(f"✅ {w.serial}: back button worked after {i + len(pair)} attempts!")
             return True
 
-    return not is_ad_playing()
+    return False
+
+
+def back_button_burst_short(stop=None, delays=None):
+    """Short back burst used as a cheap probe alongside the targeted taps."""
+    return back_button_burst(attempts=SHORT_BACK_ATTEMPTS, stop=stop, delays=delays)
+
+
+def speculative_clear(timeout=SPECULATIVE_CLEAR_SEC):
+    """
+    Run the cheap probes (targeted taps + short back burst) on two worker threads while
+    this thread watches for the game; the first to see it back stops the others.
+    The probes don't overlap on the device: every step holds the worker's `adb_shell_lock`,
+    so they take turns, and neither sends another step once the ad is gone.
+    Returns True if the ad cleared within `timeout`.
+    """
+    w = current_worker()
+    print(f"⚡ {w.serial}: speculative clear: targeted taps + short back burst...")
+    stop = threading.Event()
+    # Draw both probes' jitter and delays here, in a fixed order: the RNG state after this call
+    # must not depend on whether a probe thread got to run before being cancelled
+    rounds = close_tap_rounds()
+    delays = back_delays(SHORT_BACK_ATTEMPTS)
+    if DRY_RUN:
+        # Nothing changes on a dry run — run the probes in order so the echoed commands are stable
+        return close_ad_by_tap(stop=stop, rounds=rounds) or back_button_burst_short(stop=stop, delays=delays)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        probes = [
+            pool.submit(bound_to, w, close_ad_by_tap, stop=stop, rounds=rounds),
+            pool.submit(bound_to, w, back_button_burst_short, stop=stop, delays=delays),
+        ]
+        deadline = time.monotonic() + timeout
+        cleared = False
+        # Watch from this thread; a lookup that sees the game sets `stop` before releasing the lock
+        while True:
+            invalidate_top_cache()
+            with w.adb_shell_lock:
+                if game_in_foreground():
+                    stop.set()
+            if stop.is_set():
+                cleared = True
+                break
+            if all(f.done() for f in probes) or time.monotonic() >= deadline or stop_all.is_set():
+                break
+            time.sleep(POLL_INTERVAL_SEC)
+
+        # Stop whatever is still running before handle_ads escalates
+        stop.set()
+        for f in probes:
+            f.cancel()
+
+    for name, f in zip(("close-tap", "back-burst"), probes):
+        if not f.cancelled() and f.exception() is not None:
+            print(f"[ERROR] {w.serial}: speculative {name} probe failed: {f.exception()!r}")
+    return cleared
 
 
 def home_button_burst():
     """Rapid home button presses to kill ads."""
-    print(f"🏠 home button burst ({HOME_BUTTON_BURST} presses)...")
+    w = current_worker()
+    print(f"🏠 {w.serial}: home button burst ({HOME_BUTTON_BURST} presses)...")
 
-    for _ in range(HOME_BUTTON_BURST):
-        go_home()
-        time.sleep(0.2)
-
-    time.sleep(0.5)
-    return not is_ad_playing()
+    script = key_burst_script("KEYCODE_HOME", [0.2] * HOME_BUTTON_BURST)
+    out = run_shell_script(f"{script}; sleep 0.5; {TOP_ACTIVITY_PROBE}")
+    return not is_ad_playing(probe_top(out))
 
 
 def app_switcher_clear():
     """Use app switcher to kill ad context."""
-    print("📱 app switcher clear...")
+    w = current_worker()
+    print(f"📱 {w.serial}: app switcher clear...")
 
     # Open app switcher
     app_switcher()
@@ -387,14 +1020,15 @@ def app_switcher_clear():
 
     # Tap game to foreground it
     tap(360, 800)  # Approximate middle of screen
-    time.sleep(0.8)
+    wait_until(lambda: not is_ad_playing(), 0.8)
 
     return not is_ad_playing()
 
 
 def minimize_and_monkey_relaunch():
     """Minimize and use monkey relaunch (your friend's method)."""
-    print("🔄 minimize & monkey relaunch...")
+    w = current_worker()
+    print(f"🔄 {w.serial}: minimize & monkey relaunch...")
 
     go_home()
     time.sleep(0.8)
@@ -404,13 +1038,14 @@ def minimize_and_monkey_relaunch():
 
 def force_stop_and_relaunch():
     """Last resort: force stop and relaunch."""
-    print("🛑 FORCE STOP & RELAUNCH...")
+    w = current_worker()
+    print(f"🛑 {w.serial}: FORCE STOP & RELAUNCH...")
 
     force_stop_pkg(GAME_PACKAGE)
-    time.sleep(1.5)
+    wait_until(lambda: GAME_PACKAGE not in get_top_activity(), 1.5)
     # Try relaunch and verify; if verification fails, still return False
     success = relaunch_and_verify(retries=5, initial_delay=2.0)
-    if not success:
+    if not success and not stop_all.is_set():
         # Give the device a final wait and assume best effort
         time.sleep(APP_RESTART_WAIT_SEC)
     return success
@@ -418,31 +1053,23 @@ def force_stop_and_relaunch():
 
 def mega_escape_sequence():
     """Combined escape: back burst + home burst + switcher."""
-    print("💥 MEGA ESCAPE SEQUENCE...")
-
-    # Phase 1: Back burst
-    for _ in range(3):
-        go_back()
-        time.sleep(0.3)
-
-    time.sleep(0.5)
-
-    # Phase 2: Home burst
-    for _ in range(2):
-        go_home()
-        time.sleep(0.2)
-
-    time.sleep(0.5)
-
-    # Phase 3: App switcher
-    app_switcher()
-    time.sleep(0.5)
-    go_home()
-    time.sleep(0.5)
+    w = current_worker()
+    print(f"💥 {w.serial}: MEGA ESCAPE SEQUENCE...")
+
+    phases = [
+        # Phase 1: Back burst
+        key_burst_script("KEYCODE_BACK", [0.3, 0.3, 0.3 + 0.5]),
+        # Phase 2: Home burst
+        key_burst_script("KEYCODE_HOME", [0.2, 0.2 + 0.5]),
+        # Phase 3: App switcher
+        key_burst_script("KEYCODE_APP_SWITCH", [0.5]),
+        key_burst_script("KEYCODE_HOME", [0.5]),
+    ]
+    out = run_shell_script("; ".join(phases + [TOP_ACTIVITY_PROBE]))
 
     # Relaunch
     # If the ad opened a browser or custom tab, try to kill it first
-    top = get_top_activity()
+    top = probe_top(out)
     kill_browser_packages_if_needed(top)
 
     success = relaunch_and_verify(retries=4, initial_delay=1.2)
@@ -454,71 +1081,89 @@ def handle_ads():
     WATCHDOG METHOD - always assume ad is present and clear it.
     No detection checks, just blast through clearing methods.
     """
-    global sticky_ad_counter, last_ad_package
-
+    w = current_worker()
     current_ad = get_top_activity()
 
     # Track sticky ads
-    if current_ad == last_ad_package and current_ad != "" and current_ad != GAME_PACKAGE:
-        sticky_ad_counter += 1
-        print(f"⚠️ STICKY AD! count: {sticky_ad_counter}/{STICKY_AD_THRESHOLD}")
+    if current_ad == w.last_ad_package and current_ad != "" and current_ad != GAME_PACKAGE:
+        w.sticky_ad_counter += 1
+        print(f"⚠️ {w.serial}: STICKY AD! count: {w.sticky_ad_counter}/{STICKY_AD_THRESHOLD}")
     else:
-        last_ad_package = current_ad
+        w.last_ad_package = current_ad
 
     # WATCHDOG: No detection check, just always clear
-    print(f"🔴 WATCHDOG: clearing ad (current activity: {current_ad})")
+    print(f"🔴 {w.serial}: WATCHDOG: clearing ad (current activity: {current_ad})")
 
-    # QUICK ATTEMPT: try targeted ad-close taps first
-    if close_ad_by_tap():
-        print("✅ closed by targeted taps")
-        sticky_ad_counter = 0
+    # QUICK ATTEMPT: targeted ad-close taps + short back burst, interleaved
+    if speculative_clear():
+        print(f"✅ {w.serial}: closed by targeted taps / back")
+        w.sticky_ad_counter = 0
         return True
 
+    # Ctrl-C: stop escalating (checked before every phase)
+    if stop_all.is_set():
+        return False
+
     # PHASE 1: Minimize & monkey relaunch (FIRST - most reliable method)
     monkey_ok = minimize_and_monkey_relaunch()
-    print("✅ monkey relaunch complete" if monkey_ok else "⚠️ monkey relaunch did not finish")
+    print(f"✅ {w.serial}: monkey relaunch complete" if monkey_ok else f"⚠️ {w.serial}: monkey relaunch did not finish")
 
     # Check if we're back in game after monkey
     if monkey_ok and not is_ad_playing():
-        print("✅ back in game after monkey!")
-        sticky_ad_counter = 0
+        print(f"✅ {w.serial}: back in game after monkey!")
+        w.sticky_ad_counter = 0
         return True
 
+    if stop_all.is_set():
+        return False
+
     # PHASE 2: Back button burst
     if back_button_burst():
-        print("✅ cleared with back button!")
-        sticky_ad_counter = 0
+        print(f"✅ {w.serial}: cleared with back button!")
+        w.sticky_ad_counter = 0
         return True
 
+    if stop_all.is_set():
+        return False
+
     # PHASE 3: Home button burst
     if home_button_burst():
-        print("✅ cleared with home button!")
-        sticky_ad_counter = 0
+        print(f"✅ {w.serial}: cleared with home button!")
+        w.sticky_ad_counter = 0
         return True
 
+    if stop_all.is_set():
+        return False
+
     # PHASE 4: App switcher
     if app_switcher_clear():
-        print("✅ cleared with app switcher!")
-        sticky_ad_counter = 0
+        print(f"✅ {w.serial}: cleared with app switcher!")
+        w.sticky_ad_counter = 0
         return True
 
+    if stop_all.is_set():
+        return False
+
     # PHASE 5: Mega escape (if sticky)
-    if sticky_ad_counter >= STICKY_AD_THRESHOLD:
-        print("🔥 STICKY AD - MEGA ESCAPE!")
+    if w.sticky_ad_counter >= STICKY_AD_THRESHOLD:
+        print(f"🔥 {w.serial}: STICKY AD - MEGA ESCAPE!")
         if mega_escape_sequence():
-            print("✅ cleared with mega escape!")
-            sticky_ad_counter = 0
+            print(f"✅ {w.serial}: cleared with mega escape!")
+            w.sticky_ad_counter = 0
             return True
 
+    if stop_all.is_set():
+        return False
+
     # PHASE 6: Nuclear (force stop)
-    print("⚠️ AD WON'T DIE - FORCE STOPPING!")
+    print(f"⚠️ {w.serial}: AD WON'T DIE - FORCE STOPPING!")
     fs_ok = force_stop_and_relaunch()
     if fs_ok:
-        print("✅ cleared after force-stop & relaunch")
+        print(f"✅ {w.serial}: cleared after force-stop & relaunch")
     else:
-        print("⚠️ force-stop relaunch failed to verify")
+        print(f"⚠️ {w.serial}: force-stop relaunch failed to verify")
 
-    sticky_ad_counter = 0
+    w.sticky_ad_counter = 0
     return fs_ok
 
 
@@ -529,40 +1174,42 @@ def handle_ads():
 
 def click_lvl_button():
     """Click the level button to enter game mode."""
-    print("[game] clicking LVL button...")
+    w = current_worker()
+    print(f"[game] {w.serial}: clicking LVL button...")
     tap(*LVL_BTN)
     time.sleep(1.2)
 
 
 def click_pause_menu():
     """Click pause menu to access HOME/RETRY buttons."""
-    print("[game] opening pause menu...")
+    w = current_worker()
+    print(f"[game] {w.serial}: opening pause menu...")
     tap(*PAUSE_MENU)
     time.sleep(0.8)
 
 
 def click_home_button():
     """Click HOME button in pause menu (triggers ad)."""
-    print("[game] clicking HOME button (triggers ad)...")
+    w = current_worker()
+    print(f"[game] {w.serial}: clicking HOME button (triggers ad)...")
     tap(*HOME_BTN)
 
 
 def click_retry_button():
     """Click RETRY button in pause menu (triggers ad)."""
-    print("[game] clicking RETRY button (triggers ad)...")
+    w = current_worker()
+    print(f"[game] {w.serial}: clicking RETRY button (triggers ad)...")
     tap(*RETRY_BTN)
 
 
 def trigger_ad_button(button_type="home"):
     """Click pause menu then HOME or RETRY to trigger an ad."""
-    global needs_lvl_click
-
     # Open pause menu
     click_pause_menu()
 
     # Use RETRY only to trigger ads to avoid home-triggered popups
     click_retry_button()
-    needs_lvl_click = False  # RETRY keeps us in game mode
+    current_worker().needs_lvl_click = False  # RETRY keeps us in game mode
 
     return True
 
@@ -581,36 +1228,37 @@ def run_one_ad_cycle():
     4. AGGRESSIVELY clear ad with multiple methods
     5. Repeat
     """
-    global ad_cycle, button_mode, needs_lvl_click
+    w = current_worker()
 
     print(f"\n{'='*60}")
-    print(f"[CYCLE {ad_cycle + 1}] using {button_mode.upper()} button")
+    print(f"[CYCLE {w.ad_cycle + 1}] {w.serial}: using {w.button_mode.upper()} button")
     print(f"{'='*60}")
+    refill_jitter_pool()
 
     # If we need LVL (after HOME button or app restart), click it
-    if needs_lvl_click:
+    if w.needs_lvl_click:
         click_lvl_button()
-        needs_lvl_click = False
+        w.needs_lvl_click = False
         time.sleep(0.5)
 
     # Trigger ad with button
-    trigger_ad_button(button_mode)
+    trigger_ad_button(w.button_mode)
 
     # Wait for ad to appear
-    print(f"[ad] waiting {AD_WAIT_AFTER_BUTTON}s for ad to appear...")
-    time.sleep(AD_WAIT_AFTER_BUTTON)
+    print(f"[ad] {w.serial}: waiting up to {AD_WAIT_AFTER_BUTTON}s for ad to appear...")
+    wait_until(is_ad_playing, AD_WAIT_AFTER_BUTTON)
 
     # Handle/clear the ad AGGRESSIVELY
     cleared = handle_ads()
 
     # Check if we're back in game
     if cleared and not is_ad_playing():
-        print(f"[SUCCESS] ✅ ad cycle {ad_cycle + 1} complete!")
-        ad_cycle += 1
+        print(f"[SUCCESS] ✅ {w.serial}: ad cycle {w.ad_cycle + 1} complete!")
+        w.ad_cycle += 1
 
         return True
     else:
-        print("[warning] ⚠️ cycle incomplete, will retry")
+        print(f"[warning] ⚠️ {w.serial}: cycle incomplete, will retry")
         return False
 
 
@@ -621,94 +1269,200 @@ def run_one_ad_cycle():
 
 def log_dumpsys_cycles(n):
     """Collect top-activity values for `n` cycles and print them."""
-    print(f"[log-dumpsys] collecting {n} cycles of top activity...")
+    w = current_worker()
+    print(f"[log-dumpsys] {w.serial}: collecting {n} cycles of top activity...")
     for i in range(n):
         top = get_top_activity()
-        print(f"[{i+1}] top_activity={top}")
+        print(f"[{i+1}] {w.serial}: top_activity={top}")
         time.sleep(1)
 
 
-def main(argv=None):
-    global needs_lvl_click, DRY_RUN, LOG_DUMPSYS, DEFAULT_DEVICE
-
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--dry-run", action="store_true", help="Print adb commands instead of executing them")
-    parser.add_argument("--log-dumpsys", type=int, default=0, help="Collect top-activity values for N cycles and exit")
-    parser.add_argument("--device", type=str, default=DEFAULT_DEVICE, help="ADB device serial to use")
-    parser.add_argument("--max-cycles", type=int, default=0, help="Maximum ad cycles to run (0 = infinite)")
-    args = parser.parse_args(argv)
-
-    DRY_RUN = args.dry_run
-    LOG_DUMPSYS = args.log_dumpsys
-    DEFAULT_DEVICE = args.device
-
-    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+def run_loop(w, max_cycles=0):
+    """
+    Drive one device: set it up, run ad cycles until `max_cycles` (0 = infinite) or
+    `stop_all` is set, then leave the game freshly relaunched.
+    """
+    _local.worker = w
 
-    boot_win_adb_once()
-    print("\n" + "="*60)
-    print("🎈 BALLOON MASTER 3D - WATCHDOG AD CLEARING")
-    print("="*60)
-    print(f"[config] device: {DEFAULT_DEVICE}")
-    print(f"[config] package: {GAME_PACKAGE}")
-    print(f"[config] starting button: {button_mode.upper()}")
-    print("\n[strategy] WATCHDOG MODE - always clear, no detection:")
-    print("  1. minimize & monkey relaunch (ALWAYS FIRST)")
-    print("  2. back button burst (4-6 random)")
-    print("  3. home button burst")
-    print("  4. app switcher clear")
-    print("  5. mega escape sequence (for sticky)")
-    print("  6. force stop (nuclear)")
-    print("="*60 + "\n")
+    open_adb_shell()
+    detect_touchscreen()
+    resolve_launch_component()
+    print(f"[config] {w.serial}: launch via {'am start ' + w.launch_component if w.launch_component else 'monkey'}")
+    print(f"[config] {w.serial}: taps via {'sendevent ' + w.touchscreen[0] if w.touchscreen else 'input tap'}")
 
     if LOG_DUMPSYS > 0:
         log_dumpsys_cycles(LOG_DUMPSYS)
-        return 0
+        close_adb_shell()
+        return
 
     # Initial launch
-    print("[setup] force stopping and relaunching app...")
+    print(f"[setup] {w.serial}: force stopping and relaunching app...")
     force_stop_pkg(GAME_PACKAGE)
     time.sleep(1.0)
     relaunch_game()
     time.sleep(GAME_READY_DELAY_SEC)
 
     # Give game extra time to fully load before any taps
-    print("[setup] letting game fully load before starting...")
+    print(f"[setup] {w.serial}: letting game fully load before starting...")
     time.sleep(6.0)
 
     # ALWAYS click LVL first to enter game mode
-    print("[setup] initial LVL button click to enter game...")
+    print(f"[setup] {w.serial}: initial LVL button click to enter game...")
     click_lvl_button()
-    needs_lvl_click = False
-
-    max_cycles = args.max_cycles
+    w.needs_lvl_click = False
 
     try:
-        while (max_cycles == 0) or (ad_cycle < max_cycles):
+        while not stop_all.is_set() and ((max_cycles == 0) or (w.ad_cycle < max_cycles)):
             success = run_one_ad_cycle()
+            if stop_all.is_set():
+                break
 
             # Random cooldown to avoid patterns
-            cooldown = random.uniform(*CYCLE_COOLDOWN_SEC)
-            print(f"[cooldown] waiting {cooldown:.2f}s before next cycle...")
+            cooldown = w.rng.uniform(*CYCLE_COOLDOWN_SEC)
+            print(f"[cooldown] {w.serial}: waiting {cooldown:.2f}s before next cycle...")
             time.sleep(cooldown)
 
             if not success:
                 # If cycle failed, extra wait
-                print("[retry] extra wait after failed cycle...")
+                print(f"[retry] {w.serial}: extra wait after failed cycle...")
                 time.sleep(2)
 
-    except KeyboardInterrupt:
-        print("\n[STOP] script stopped by user")
     except Exception as e:
-        print(f"\n[ERROR] script crashed: {e}")
+        print(f"\n[ERROR] {w.serial}: script crashed: {e}")
         print(traceback.format_exc())
 
     # After finishing cycles, do a clean force-stop and relaunch to ensure no sticky state
-    print("[done] reached max cycles or exiting - performing final refresh (force-stop & relaunch)")
+    print(f"[done] {w.serial}: reached max cycles or exiting - performing final refresh (force-stop & relaunch)")
     force_stop_pkg(GAME_PACKAGE)
     time.sleep(1.0)
     relaunch_game()
     time.sleep(GAME_READY_DELAY_SEC)
-    print("[done] refresh complete; exiting")
+    close_adb_shell()
+    print(f"[done] {w.serial}: refresh complete")
+
+
+USAGE = "usage: balloon_master_ads.py [--dry-run] [--log-dumpsys N] [--device SERIAL [SERIAL ...]] [--max-cycles N]"
+USAGE_HELP = """
+  --dry-run              Print adb commands instead of executing them
+  --log-dumpsys N        Collect top-activity values for N cycles and exit
+  --device SERIAL ...    ADB device serial(s) to use, one worker each
+  --max-cycles N         Maximum ad cycles to run (0 = infinite)"""
+FLAGS = ("--dry-run", "--log-dumpsys", "--device", "--max-cycles", "--help")
+
+
+def _usage_error(msg):
+    print(USAGE, file=sys.stderr)
+    print(f"error: {msg}", file=sys.stderr)
+    sys.exit(2)
+
+
+def parse_args(argv=None):
+    """
+    Hand-rolled parser for the four flags above (importing argparse is a quarter of
+    startup). Accepts `--flag value`, `--flag=value` and unique prefixes (`--dry`, `--max=3`),
+    as argparse did; exits 2 on bad input.
+    """
+    args = SimpleNamespace(dry_run=False, log_dumpsys=0, device=[DEFAULT_DEVICE], max_cycles=0)
+    argv = sys.argv[1:] if argv is None else list(argv)
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        flag, eq, inline = arg.partition("=")
+        i += 1
+        if len(flag) > 2 and flag.startswith("--") and flag not in FLAGS:
+            matches = [f for f in FLAGS if f.startswith(flag)]
+            if len(matches) > 1:
+                _usage_error(f"ambiguous option: {flag} could match {', '.join(matches)}")
+            if matches:
+                flag = matches[0]
+        if flag in ("-h", "--help") and not eq:
+            print(USAGE + USAGE_HELP)
+            sys.exit(0)
+        elif flag == "--dry-run" and not eq:
+            args.dry_run = True
+        elif flag in ("--log-dumpsys", "--max-cycles"):
+            if not eq:
+                if i >= len(argv):
+                    _usage_error(f"argument {flag}: expected one argument")
+                inline = argv[i]
+                i += 1
+            try:
+                setattr(args, flag[2:].replace("-", "_"), int(inline))
+            except ValueError:
+                _usage_error(f"argument {flag}: invalid int value: {inline!r}")
+        elif flag == "--device":
+            serials = [inline] if eq else []
+            while not eq and i < len(argv) and not argv[i].startswith("-"):
+                serials.append(argv[i])
+                i += 1
+            # An empty serial is a valid value: no `-s`, adb picks the only attached device
+            if not serials:
+                _usage_error("argument --device: expected at least one argument")
+            args.device = serials
+        else:
+            _usage_error(f"unrecognized arguments: {arg}")
+    return args
+
+
+def main(argv=None):
+    global DRY_RUN, LOG_DUMPSYS, DRY_RUN_FLUSH_EVERY
+
+    args = parse_args(argv)
+
+    DRY_RUN = args.dry_run
+    LOG_DUMPSYS = args.log_dumpsys
+    if DRY_RUN:
+        if sys.stdout.isatty():
+            DRY_RUN_FLUSH_EVERY = 1  # interactive: keep commands next to the progress output
+        atexit.register(flush_dry_run)
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+
+    # Pattern sets / compiled matchers are module-level and shared read-only by all workers
+    workers = [DeviceWorker(serial) for serial in dict.fromkeys(args.device)]
+
+    boot_win_adb_once()
+    print("\n" + "="*60)
+    print("🎈 BALLOON MASTER 3D - WATCHDOG AD CLEARING")
+    print("="*60)
+    print(f"[config] devices: {', '.join(w.serial or '(default)' for w in workers)}")
+    print(f"[config] package: {GAME_PACKAGE}")
+    print(f"[config] starting button: {workers[0].button_mode.upper()}")
+    print("\n[strategy] WATCHDOG MODE - always clear, no detection:")
+    print("  1. speculative clear: targeted close taps + short back burst (ALWAYS FIRST)")
+    print("  2. minimize & relaunch (am start, monkey fallback)")
+    print("  3. back button burst (4-6 random)")
+    print("  4. home button burst")
+    print("  5. app switcher clear")
+    print("  6. mega escape sequence (for sticky)")
+    print("  7. force stop (nuclear)")
+    print("="*60 + "\n")
+
+    with ThreadPoolExecutor(max_workers=len(workers)) as pool:
+        loops = [pool.submit(run_loop, w, args.max_cycles) for w in workers]
+        # Short timed waits so Ctrl-C reaches this (main) thread promptly. The first press stops the
+        # workers at their next step (they still do the final refresh); a second one exits right away
+        while True:
+            try:
+                if not wait(loops, timeout=0.5).not_done:
+                    break
+            except KeyboardInterrupt:
+                if stop_all.is_set():
+                    print("\n[STOP] second Ctrl-C - exiting without waiting for workers")
+                    if DRY_RUN:
+                        flush_dry_run()
+                    sys.stdout.flush()
+                    # Pool threads can't be interrupted and would be joined at exit, so leave hard
+                    os._exit(130)
+                print("\n[STOP] script stopped by user - stopping workers (Ctrl-C again to exit now)...")
+                stop_all.set()
+
+    for w, f in zip(workers, loops):
+        if f.exception() is not None:
+            print(f"[ERROR] {w.serial}: worker failed: {f.exception()}")
+
+    print("[done] all devices finished; exiting")
+    return 0
 
 
 if __name__ == "__main__":